@@ -1,16 +1,56 @@
 import base64
 import dataclasses
 import enum
+import hashlib
+import json
+import os
+import tempfile
 import time
 from typing import Any, Dict, List, Optional, Type, TypeVar, Tuple
 
 import pydantic
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from ..utils import getLogger
 
 logger = getLogger(__name__)
 
+# dbt diffs talk to the API from up to this many threads at once
+HTTP_POOL_SIZE = 32
+
+# org meta barely ever changes, so it is kept on disk between runs
+META_CACHE_FILE = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "data-diff", "meta.json"
+)
+META_CACHE_TTL = 60 * 60  # seconds
+
+
+def _load_meta_cache() -> Dict[str, Any]:
+    try:
+        with open(META_CACHE_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_meta_cache(cache: Dict[str, Any]) -> None:
+    cache_dir = os.path.dirname(META_CACHE_FILE)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # write to a temporary file first, so concurrent runs never read a partially written cache
+        with tempfile.NamedTemporaryFile("w", dir=cache_dir, suffix=".tmp", delete=False) as f:
+            json.dump(cache, f)
+        try:
+            os.replace(f.name, META_CACHE_FILE)
+        except OSError:
+            os.unlink(f.name)
+            raise
+    except OSError as e:
+        logger.debug(f"Failed to write {META_CACHE_FILE}: {e}")
+
+
 Self = TypeVar("Self", bound=pydantic.BaseModel)
 
 
@@ -190,14 +230,25 @@ class DatafoldAPI:
             "Authorization": f"Key {self.api_key}",
             "Content-Type": "application/json",
         }
+        # A single session keeps connections alive across requests and threads,
+        # so only the first request to the host pays for the TCP/TLS handshake.
+        # Retry only covers idempotent methods; POSTs are never replayed.
+        retries = Retry(total=3, backoff_factor=0.5, status_forcelist=(502, 503, 504), raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE, max_retries=retries)
+        self._session = requests.Session()
+        self._session.headers.update(self.headers)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        self._org_meta = None
+        self._data_sources = {}
 
     def make_get_request(self, url: str) -> Any:
-        rv = requests.get(url=f"{self.host}/{url}", headers=self.headers, timeout=self.timeout)
+        rv = self._session.get(url=f"{self.host}/{url}", timeout=self.timeout)
         rv.raise_for_status()
         return rv
 
     def make_post_request(self, url: str, payload: Any) -> Any:
-        rv = requests.post(url=f"{self.host}/{url}", headers=self.headers, json=payload, timeout=self.timeout)
+        rv = self._session.post(url=f"{self.host}/{url}", json=payload, timeout=self.timeout)
         rv.raise_for_status()
         return rv
 
@@ -207,9 +258,12 @@ class DatafoldAPI:
         return [TCloudApiDataSource(**item) for item in rv.json()]
 
     def get_data_source(self, data_source_id: int) -> TCloudApiDataSource:
-        rv = self.make_get_request(url=f"api/v1/data_sources/{data_source_id}")
-        rv.raise_for_status()
-        return TCloudApiDataSource(**rv.json())
+        # only memoized in-process, the response holds the connection options
+        if data_source_id not in self._data_sources:
+            rv = self.make_get_request(url=f"api/v1/data_sources/{data_source_id}")
+            rv.raise_for_status()
+            self._data_sources[data_source_id] = TCloudApiDataSource(**rv.json())
+        return self._data_sources[data_source_id]
 
     def create_data_source(self, config: TDsConfig) -> TCloudApiDataSource:
         payload = config.dict()
@@ -238,30 +292,30 @@ class DatafoldAPI:
         return rv.json()["id"]
 
     def poll_data_diff_results(self, diff_id: int) -> TCloudApiDataDiffSummaryResult:
-        summary_results = None
         start_time = time.monotonic()
         sleep_interval = 5  # starts at 5 sec
         max_sleep_interval = 30
         max_wait_time = 300
 
         diff_url = f"{self.host}/datadiffs/{diff_id}/overview"
-        while not summary_results:
+        while True:
             logger.debug(f"Polling: {diff_url}")
             response = self.make_get_request(url=f"api/v1/datadiffs/{diff_id}/summary_results")
             response_json = response.json()
+            # return as soon as the diff is done, without waiting out the current interval
             if response_json["status"] == "success":
-                summary_results = response_json
+                return TCloudApiDataDiffSummaryResult.from_orm(response_json)
             elif response_json["status"] == "failed":
                 raise Exception(f"Diff failed: {str(response_json)}")
 
-            if time.monotonic() - start_time > max_wait_time:
+            elapsed = time.monotonic() - start_time
+            if elapsed > max_wait_time:
                 raise Exception(f"Timed out waiting for diff results. Please, go to the UI for details: {diff_url}")
 
-            time.sleep(sleep_interval)
+            # don't oversleep the deadline, give the diff one last poll instead
+            time.sleep(min(sleep_interval, max_wait_time - elapsed))
             sleep_interval = min(sleep_interval * 2, max_sleep_interval)
 
-        return TCloudApiDataDiffSummaryResult.from_orm(summary_results)
-
     def test_data_source(self, data_source_id: int) -> int:
         rv = self.make_post_request(f"api/v1/data_sources/{data_source_id}/test", {})
         return rv.json()["job_id"]
@@ -284,8 +338,20 @@ class DatafoldAPI:
         ]
 
     def get_org_meta(self) -> TCloudApiOrgMeta:
-        response = self.make_get_request(f"api/v1/organization/meta")
-        response_json = response.json()
-        return TCloudApiOrgMeta(
-            org_id=response_json["org_id"], org_name=response_json["org_name"], user_id=response_json["user_id"]
-        )
+        if self._org_meta is None:
+            cache_key = f"{self.host}|{hashlib.sha256(self.api_key.encode()).hexdigest()}"
+            cache = _load_meta_cache()
+            entry = cache.get(cache_key)
+            if not entry or time.time() - entry.get("time", 0) > META_CACHE_TTL:
+                response = self.make_get_request(f"api/v1/organization/meta")
+                response_json = response.json()
+                org_meta = {
+                    "org_id": response_json["org_id"],
+                    "org_name": response_json["org_name"],
+                    "user_id": response_json["user_id"],
+                }
+                entry = {"time": time.time(), "org_meta": org_meta}
+                cache[cache_key] = entry
+                _save_meta_cache(cache)
+            self._org_meta = TCloudApiOrgMeta(**entry["org_meta"])
+        return self._org_meta
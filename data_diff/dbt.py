@@ -1,14 +1,16 @@
+import dataclasses
 import os
+import threading
 import time
 import webbrowser
-from typing import List, Optional, Dict
+from queue import Empty, Queue
+from typing import Any, List, Optional, Dict
 import keyring
 
-import pydantic
 import rich
 from rich.prompt import Confirm
 
-from . import connect_to_table, diff_tables, Algorithm
+from . import connect, connect_to_table, diff_tables, Algorithm
 from .cloud import DatafoldAPI, TCloudApiDataDiff, TCloudApiOrgMeta, get_or_create_data_source
 from .dbt_parser import DbtParser, PROJECT_FILE
 from .tracking import (
@@ -18,7 +20,8 @@ from .tracking import (
     set_dbt_project_id,
     create_end_event_json,
     create_start_event_json,
-    send_event_json,
+    flush_event_queue,
+    queue_event_json,
     is_tracking_enabled,
 )
 from .utils import (
@@ -28,23 +31,36 @@ from .utils import (
     columns_removed_template,
     no_differences_template,
     columns_type_changed_template,
-    run_as_daemon,
     truncate_error,
     print_version_info,
+    run_as_daemon,
 )
 
 logger = getLogger(__name__)
 
+# cloud diffs spend nearly all their time waiting on the Datafold API
+MAX_CLOUD_DIFF_WORKERS = 32
+# used when the dbt profile doesn't set a number of threads
+DEFAULT_LOCAL_DIFF_WORKERS = 8
 
-class TDiffVars(pydantic.BaseModel):
+
+@dataclasses.dataclass(frozen=True)
+class TDiffVars:
     dev_path: List[str]
     prod_path: List[str]
     primary_keys: List[str]
-    connection: Dict[str, Optional[str]]
-    threads: Optional[int] = None
-    where_filter: Optional[str] = None
+    connection: Dict[str, Any]
     include_columns: List[str]
     exclude_columns: List[str]
+    threads: Optional[int] = None
+    where_filter: Optional[str] = None
+    dev_qualified_str: str = dataclasses.field(init=False)
+    prod_qualified_str: str = dataclasses.field(init=False)
+
+    def __post_init__(self):
+        # derived once per model; frozen, so set through object.__setattr__
+        object.__setattr__(self, "dev_qualified_str", ".".join(self.dev_path))
+        object.__setattr__(self, "prod_qualified_str", ".".join(self.prod_path))
 
 
 def dbt_diff(
@@ -54,7 +70,9 @@ def dbt_diff(
     dbt_selection: Optional[str] = None,
 ) -> None:
     print_version_info()
-    diff_threads = []
+    diffs = []
+    db = None
+    interrupted = False
     set_entrypoint_name("CLI-dbt")
     dbt_parser = DbtParser(profiles_dir_override, project_dir_override)
     models = dbt_parser.get_models(dbt_selection)
@@ -105,25 +123,77 @@ def dbt_diff(
 
     for model in models:
         diff_vars = _get_diff_vars(
-            dbt_parser, config_prod_database, config_prod_schema, config_prod_custom_schema, model
+            dbt_parser, config_prod_database, config_prod_schema, config_prod_custom_schema, model, cloud_only=is_cloud
         )
 
         if diff_vars.primary_keys:
-            if is_cloud:
-                diff_thread = run_as_daemon(_cloud_diff, diff_vars, datasource_id, api, org_meta)
-                diff_threads.append(diff_thread)
-            else:
-                _local_diff(diff_vars)
+            diffs.append(diff_vars)
         else:
             rich.print(
-                _diff_output_base(".".join(diff_vars.dev_path), ".".join(diff_vars.prod_path))
+                _diff_output_base(diff_vars.dev_qualified_str, diff_vars.prod_qualified_str)
                 + "Skipped due to unknown primary key. Add uniqueness tests, meta, or tags.\n"
             )
 
-    # wait for all threads
-    if diff_threads:
-        for thread in diff_threads:
+    if diffs and not is_cloud:
+        # connect() only caches connections weakly, so keep a reference for the
+        # whole run to have every model reuse it instead of reconnecting
+        db = connect(dbt_parser.connection, dbt_parser.threads)
+
+    try:
+        # submit the diffs only once every model has been resolved
+        if diffs:
+            max_workers = MAX_CLOUD_DIFF_WORKERS if is_cloud else dbt_parser.threads or DEFAULT_LOCAL_DIFF_WORKERS
+            if is_cloud:
+                _run_diffs(_cloud_diff, [(diff_vars, datasource_id, api, org_meta) for diff_vars in diffs], max_workers)
+            else:
+                _run_diffs(_local_diff, [(diff_vars,) for diff_vars in diffs], max_workers)
+    except KeyboardInterrupt:
+        interrupted = True
+        raise
+    finally:
+        if db is not None:
+            db.close()
+
+        # give the queued tracking events a chance to go out before the CLI exits,
+        # unless the user asked it to exit right away
+        if not interrupted:
+            flush_event_queue()
+
+
+def _run_diffs(diff_func, diff_args: List[tuple], max_workers: int) -> None:
+    """Runs diff_func for each of the arguments on up to max_workers threads, and raises the first failure.
+
+    The workers are daemon threads, so they don't hold up the process from exiting on an interrupt.
+    """
+    pending = Queue()
+    for index, args in enumerate(diff_args):
+        pending.put((index, args))
+    stop = threading.Event()
+    errors = {}
+
+    def worker():
+        while not stop.is_set():
+            try:
+                index, args = pending.get_nowait()
+            except Empty:
+                return
+            try:
+                diff_func(*args)
+            except Exception as e:
+                errors[index] = e
+
+    workers = [run_as_daemon(worker) for _ in range(min(len(diff_args), max_workers))]
+    try:
+        for thread in workers:
             thread.join()
+    except KeyboardInterrupt:
+        # don't start the diffs that are still pending
+        stop.set()
+        raise
+
+    # surface the first failure, as running the diffs one by one would
+    if errors:
+        raise errors[min(errors)]
 
 
 def _get_diff_vars(
@@ -132,6 +202,7 @@ def _get_diff_vars(
     config_prod_schema: Optional[str],
     config_prod_custom_schema: Optional[str],
     model,
+    cloud_only: bool = False,
 ) -> TDiffVars:
     dev_database = model.database
     dev_schema = model.schema_
@@ -174,12 +245,13 @@ def _get_diff_vars(
 
     datadiff_model_config = dbt_parser.get_datadiff_model_config(model.meta)
 
+    # cloud diffs run on the Datafold side, the local connection is never used
     return TDiffVars(
         dev_path=dev_qualified_list,
         prod_path=prod_qualified_list,
         primary_keys=primary_keys,
-        connection=dbt_parser.connection,
-        threads=dbt_parser.threads,
+        connection={} if cloud_only else dbt_parser.connection,
+        threads=None if cloud_only else dbt_parser.threads,
         where_filter=datadiff_model_config.where_filter,
         include_columns=datadiff_model_config.include_columns,
         exclude_columns=datadiff_model_config.exclude_columns,
@@ -187,34 +259,50 @@ def _get_diff_vars(
 
 
 def _local_diff(diff_vars: TDiffVars) -> None:
-    dev_qualified_str = ".".join(diff_vars.dev_path)
-    prod_qualified_str = ".".join(diff_vars.prod_path)
-    diff_output_str = _diff_output_base(dev_qualified_str, prod_qualified_str)
+    diff_output_str = _diff_output_base(diff_vars.dev_qualified_str, diff_vars.prod_qualified_str)
 
-    table1 = connect_to_table(diff_vars.connection, dev_qualified_str, tuple(diff_vars.primary_keys), diff_vars.threads)
+    table1 = connect_to_table(
+        diff_vars.connection, diff_vars.dev_qualified_str, tuple(diff_vars.primary_keys), diff_vars.threads
+    )
     table2 = connect_to_table(
-        diff_vars.connection, prod_qualified_str, tuple(diff_vars.primary_keys), diff_vars.threads
+        diff_vars.connection, diff_vars.prod_qualified_str, tuple(diff_vars.primary_keys), diff_vars.threads
     )
 
+    # the schema queries are independent, fetch prod's in the background while querying dev
+    table2_schema = {}
+
+    def get_table2_schema():
+        try:
+            table2_schema["columns"] = table2.get_schema()
+        # Not ideal, but we don't have more specific exceptions yet
+        except Exception as ex:
+            table2_schema["error"] = ex
+
+    table2_thread = run_as_daemon(get_table2_schema)
     table1_columns = table1.get_schema()
-    try:
-        table2_columns = table2.get_schema()
-    # Not ideal, but we don't have more specific exceptions yet
-    except Exception as ex:
-        logger.debug(ex)
+    table2_thread.join()
+
+    if "error" in table2_schema:
+        logger.debug(table2_schema["error"])
         diff_output_str += "[red]New model or no access to prod table.[/] \n"
         rich.print(diff_output_str)
         return
-
-    table1_column_names = set(table1_columns.keys())
-    table2_column_names = set(table2_columns.keys())
-    column_set = table1_column_names.intersection(table2_column_names)
-    columns_added = table1_column_names.difference(table2_column_names)
-    columns_removed = table2_column_names.difference(table1_column_names)
-    # col type is i = 1 in tuple
-    columns_type_changed = {
-        k for k, v in table1_columns.items() if k in table2_columns and v[1] != table2_columns[k][1]
-    }
+    table2_columns = table2_schema["columns"]
+
+    # matching columns with the same type are the ones to diff
+    column_set = set()
+    columns_added = set()
+    columns_type_changed = set()
+    for column_name, column_info in table1_columns.items():
+        table2_column_info = table2_columns.get(column_name)
+        if table2_column_info is None:
+            columns_added.add(column_name)
+        # col type is i = 1 in tuple
+        elif column_info[1] != table2_column_info[1]:
+            columns_type_changed.add(column_name)
+        else:
+            column_set.add(column_name)
+    columns_removed = table2_columns.keys() - table1_columns.keys()
 
     if columns_added:
         diff_output_str += columns_added_template(columns_added)
@@ -224,18 +312,23 @@ def _local_diff(diff_vars: TDiffVars) -> None:
 
     if columns_type_changed:
         diff_output_str += columns_type_changed_template(columns_type_changed)
-        column_set = column_set.difference(columns_type_changed)
 
     column_set = column_set - set(diff_vars.primary_keys)
 
     if diff_vars.include_columns:
-        column_set = {x for x in column_set if x.upper() in [y.upper() for y in diff_vars.include_columns]}
+        include_columns = {x.upper() for x in diff_vars.include_columns}
+        column_set = {x for x in column_set if x.upper() in include_columns}
 
     if diff_vars.exclude_columns:
-        column_set = {x for x in column_set if x.upper() not in [y.upper() for y in diff_vars.exclude_columns]}
+        exclude_columns = {x.upper() for x in diff_vars.exclude_columns}
+        column_set = {x for x in column_set if x.upper() not in exclude_columns}
 
     extra_columns = tuple(column_set)
 
+    # hand the schemas fetched above to the segments, so the diff doesn't query them a second time
+    table1 = table1.with_raw_schema(table1_columns)
+    table2 = table2.with_raw_schema(table2_columns)
+
     diff = diff_tables(
         table1,
         table2,
@@ -246,7 +339,8 @@ def _local_diff(diff_vars: TDiffVars) -> None:
         skip_null_keys=True,
     )
 
-    if list(diff):
+    # only pull the first row here, the stats consume the rest (the wrapper keeps the rows it yielded)
+    if next(iter(diff), None) is not None:
         diff_output_str += f"{diff.get_stats_string(is_dbt=True)} \n"
         rich.print(diff_output_str)
     else:
@@ -262,7 +356,15 @@ def _initialize_api() -> Optional[DatafoldAPI]:
     rich.print(f"Cloud datafold host: {datafold_host}")
 
     api_key = os.environ.get("DATAFOLD_API_KEY")
-    if not api_key:
+    if api_key:
+        # each keyring call goes through the system's secret service, only write when the key changed
+        try:
+            if keyring.get_password("data-diff", "DATAFOLD_API_KEY") != api_key:
+                rich.print("Saving the API key to the system keyring service")
+                keyring.set_password("data-diff", "DATAFOLD_API_KEY", api_key)
+        except Exception as e:
+            rich.print(f"[red]Failed when saving the API key to the system keyring service. Reason: {e}")
+    else:
         rich.print("[red]API key not found. Getting from the keyring service")
         api_key = keyring.get_password("data-diff", "DATAFOLD_API_KEY")
         if not api_key:
@@ -276,17 +378,11 @@ def _initialize_api() -> Optional[DatafoldAPI]:
             else:
                 raise ValueError("Cannot initialize API because the API key is not provided")
 
-    rich.print("Saving the API key to the system keyring service")
-    try:
-        keyring.set_password("data-diff", "DATAFOLD_API_KEY", api_key)
-    except Exception as e:
-        rich.print(f"[red]Failed when saving the API key to the system keyring service. Reason: {e}")
-
     return DatafoldAPI(api_key=api_key, host=datafold_host)
 
 
 def _cloud_diff(diff_vars: TDiffVars, datasource_id: int, api: DatafoldAPI, org_meta: TCloudApiOrgMeta) -> None:
-    diff_output_str = _diff_output_base(".".join(diff_vars.dev_path), ".".join(diff_vars.prod_path))
+    diff_output_str = _diff_output_base(diff_vars.dev_qualified_str, diff_vars.prod_qualified_str)
     payload = TCloudApiDataDiff(
         data_source1_id=datasource_id,
         data_source2_id=datasource_id,
@@ -301,7 +397,7 @@ def _cloud_diff(diff_vars: TDiffVars, datasource_id: int, api: DatafoldAPI, org_
 
     if is_tracking_enabled():
         event_json = create_start_event_json({"is_cloud": True, "datasource_id": datasource_id})
-        run_as_daemon(send_event_json, event_json)
+        queue_event_json(event_json)
 
     start = time.monotonic()
     error = None
@@ -354,7 +450,8 @@ def _cloud_diff(diff_vars: TDiffVars, datasource_id: int, api: DatafoldAPI, org_
             diff_output_str += f"\n{diff_url}\n{no_differences_template()}\n"
             rich.print(diff_output_str)
 
-    except BaseException as ex:  # Catch KeyboardInterrupt too
+    # KeyboardInterrupt is only raised in the main thread, it never reaches the diff workers
+    except Exception as ex:
         error = ex
     finally:
         # we don't currently have much of this information
@@ -377,13 +474,15 @@ def _cloud_diff(diff_vars: TDiffVars, datasource_id: int, api: DatafoldAPI, org_
                 org_name=org_meta.org_name,
                 user_id=org_meta.user_id,
             )
-            send_event_json(event_json)
+            # the worker moves on to the next diff while the event is sent in the background
+            queue_event_json(event_json)
 
         if error:
-            rich.print(diff_output_str)
+            # a single print keeps the model's output together when diffs run in parallel
             if diff_id:
                 diff_url = f"{api.host}/datadiffs/{diff_id}/overview"
-                rich.print(f"{diff_url} \n")
+                diff_output_str += f"\n{diff_url} \n"
+            rich.print(diff_output_str)
             logger.error(error)
 
 
@@ -103,6 +103,8 @@ class DbtParser:
         self.requires_upper = False
         self.threads = None
         self.unique_columns = self.get_unique_columns()
+        self._pk_cache = {}
+        self._model_config_cache = {}
 
     def get_datadiff_variables(self) -> dict:
         doc_url = "https://docs.datafold.com/development_testing/open_source#configure-your-dbt-project"
@@ -113,6 +115,16 @@ class DbtParser:
         return get_from_dict_with_raise(vars_dict, "data_diff", exception)
 
     def get_datadiff_model_config(self, model_meta: dict) -> TDatadiffModelConfig:
+        # keyed by identity, the meta dicts live as long as the manifest
+        cached = self._model_config_cache.get(id(model_meta))
+        if cached is not None and cached[0] is model_meta:
+            return cached[1]
+
+        config = self._parse_datadiff_model_config(model_meta)
+        self._model_config_cache[id(model_meta)] = (model_meta, config)
+        return config
+
+    def _parse_datadiff_model_config(self, model_meta: dict) -> TDatadiffModelConfig:
         where_filter = None
         include_columns = []
         exclude_columns = []
@@ -351,6 +363,15 @@ class DbtParser:
         self.connection = conn_info
 
     def get_pk_from_model(self, node, unique_columns: dict, pk_tag: str) -> List[str]:
+        # the result depends on unique_columns too, which is keyed by identity like the model configs
+        cache_key = (node.unique_id, id(unique_columns), pk_tag)
+        cached = self._pk_cache.get(cache_key)
+        if cached is None or cached[0] is not unique_columns:
+            cached = (unique_columns, self._find_pk_from_model(node, unique_columns, pk_tag))
+            self._pk_cache[cache_key] = cached
+        return list(cached[1])
+
+    def _find_pk_from_model(self, node, unique_columns: dict, pk_tag: str) -> List[str]:
         try:
             # Get a set of all the column names
             column_names = {name for name, params in node.columns.items()}
@@ -14,10 +14,16 @@ from runtype import dataclass
 
 from data_diff.info_tree import InfoTree, SegmentInfo
 
-from .utils import dbt_diff_string_template, run_as_daemon, safezip, getLogger, truncate_error, Vector
+from .utils import dbt_diff_string_template, safezip, getLogger, truncate_error, Vector
 from .thread_utils import ThreadedYielder
 from .table_segment import TableSegment, create_mesh_from_points
-from .tracking import create_end_event_json, create_start_event_json, send_event_json, is_tracking_enabled
+from .tracking import (
+    create_end_event_json,
+    create_start_event_json,
+    queue_event_json,
+    send_event_json,
+    is_tracking_enabled,
+)
 from data_diff.sqeleton.abcs import IKey
 
 logger = getLogger(__name__)
@@ -207,7 +213,7 @@ class TableDiffer(ThreadBase, ABC):
             options = dict(self)
             options["differ_name"] = type(self).__name__
             event_json = create_start_event_json(options)
-            run_as_daemon(send_event_json, event_json)
+            queue_event_json(event_json)
 
         start = time.monotonic()
         error = None
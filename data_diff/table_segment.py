@@ -121,6 +121,7 @@ class TableSegment:
 
     case_sensitive: bool = True
     _schema: Schema = None
+    _raw_schema: dict = None
 
     def __post_init__(self):
         if not self.update_column and (self.min_update or self.max_update):
@@ -141,12 +142,19 @@ class TableSegment:
         schema = self.database._process_table_schema(self.table_path, raw_schema, self.relevant_columns, self._where())
         return self.new(_schema=create_schema(self.database, self.table_path, schema, self.case_sensitive))
 
+    def with_raw_schema(self, raw_schema: dict) -> "TableSegment":
+        "Returns a new instance of TableSegment, that will use the given raw schema instead of querying it."
+        return self.new(_raw_schema=raw_schema)
+
     def with_schema(self) -> "TableSegment":
         "Queries the table schema from the database, and returns a new instance of TableSegment, with a schema."
         if self._schema:
             return self
 
-        return self._with_raw_schema(self.database.query_table_schema(self.table_path))
+        raw_schema = self._raw_schema
+        if raw_schema is None:
+            raw_schema = self.database.query_table_schema(self.table_path)
+        return self._with_raw_schema(raw_schema)
 
     def get_schema(self):
         return self.database.query_table_schema(self.table_path)
@@ -6,12 +6,15 @@ import logging
 import os
 import json
 import platform
+import threading
+from queue import Queue
 from time import time
 from typing import Any, Dict, Optional
 import urllib.request
 from uuid import uuid4
 import toml
 
+from .utils import run_as_daemon
 from .version import __version__
 
 TRACK_URL = "https://hosted.rudderlabs.com/v1/track"
@@ -165,3 +168,58 @@ def send_event_json(event_json):
                 raise RuntimeError(res)
     except Exception as e:
         logging.debug(f"Failed to post to Rudderstack: {e}")
+
+
+# senders are only started while events wait for a free one, up to this many
+MAX_EVENT_SENDERS = 8
+
+_event_queue = None
+_event_senders = 0
+_event_queue_lock = threading.Lock()
+
+
+def _send_queued_events(event_queue: Queue):
+    while True:
+        event_json = event_queue.get()
+        try:
+            send_event_json(event_json)
+        except Exception as e:
+            logging.debug(f"Failed to send event: {e}")
+        finally:
+            event_queue.task_done()
+
+
+def queue_event_json(event_json):
+    """Send the event from a background thread, without blocking the caller.
+
+    Instead of a thread per event, a few daemon threads drain a shared queue, so events
+    queued together (e.g. by parallel diffs) are still posted concurrently.
+    """
+    global _event_queue, _event_senders
+    with _event_queue_lock:
+        if _event_queue is None:
+            _event_queue = Queue()
+        _event_queue.put(event_json)
+        # unfinished_tasks counts the events being sent too, so this only grows while every sender is busy
+        if _event_senders < MAX_EVENT_SENDERS and _event_queue.unfinished_tasks > _event_senders:
+            run_as_daemon(_send_queued_events, _event_queue)
+            _event_senders += 1
+
+
+def flush_event_queue(timeout: Optional[float] = None):
+    """Wait (at most `timeout` seconds, TIMEOUT by default) for the queued events to be sent.
+
+    The wait doesn't grow with the number of queued events, so a slow endpoint can't hold up the exit for long.
+    """
+    if _event_queue is None:
+        return
+
+    if timeout is None:
+        timeout = TIMEOUT
+    deadline = time() + timeout
+    with _event_queue.all_tasks_done:
+        while _event_queue.unfinished_tasks:
+            remaining = deadline - time()
+            if remaining <= 0:
+                break
+            _event_queue.all_tasks_done.wait(remaining)
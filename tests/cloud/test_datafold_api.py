@@ -0,0 +1,88 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import Mock, patch
+
+from data_diff.cloud.datafold_api import DatafoldAPI, _load_meta_cache, _save_meta_cache
+
+
+class TestDatafoldAPI(unittest.TestCase):
+    def setUp(self) -> None:
+        self.api = DatafoldAPI(api_key="an_api_key", host="https://datafold.example.com/")
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.cache_file = os.path.join(tmp_dir.name, "data-diff", "meta.json")
+        cache_patch = patch("data_diff.cloud.datafold_api.META_CACHE_FILE", self.cache_file)
+        cache_patch.start()
+        self.addCleanup(cache_patch.stop)
+
+    def test_requests_share_one_session(self):
+        response = Mock()
+        response.json.return_value = {"org_id": 1, "org_name": "org", "user_id": 2}
+        with patch.object(self.api._session, "request", return_value=response) as mock_request:
+            self.api.get_org_meta()
+            self.api.make_post_request("api/v1/datadiffs", {})
+
+        self.assertEqual(mock_request.call_count, 2)
+        self.assertEqual(
+            mock_request.call_args_list[0][0], ("GET", "https://datafold.example.com/api/v1/organization/meta")
+        )
+        self.assertEqual(mock_request.call_args_list[1][0], ("POST", "https://datafold.example.com/api/v1/datadiffs"))
+        self.assertEqual(self.api._session.headers["Authorization"], "Key an_api_key")
+
+    @patch("data_diff.cloud.datafold_api.time.sleep")
+    def test_poll_data_diff_results_returns_on_success(self, mock_sleep):
+        pending, done = Mock(), Mock()
+        pending.json.return_value = {"status": "running"}
+        done.json.return_value = {"status": "success"}
+        with patch.object(self.api, "make_get_request", side_effect=[pending, pending, done]) as mock_get:
+            result = self.api.poll_data_diff_results(123)
+
+        self.assertEqual(result.status, "success")
+        self.assertEqual(mock_get.call_count, 3)
+        # backs off between polls, but never sleeps once the diff is done
+        self.assertEqual([c[0][0] for c in mock_sleep.call_args_list], [5, 10])
+
+    @patch("data_diff.cloud.datafold_api.time.sleep")
+    def test_poll_data_diff_results_failed(self, mock_sleep):
+        failed = Mock()
+        failed.json.return_value = {"status": "failed"}
+        with patch.object(self.api, "make_get_request", return_value=failed):
+            with self.assertRaises(Exception):
+                self.api.poll_data_diff_results(123)
+
+        mock_sleep.assert_not_called()
+
+    def test_get_org_meta_cached_across_instances(self):
+        response = Mock()
+        response.json.return_value = {"org_id": 1, "org_name": "org", "user_id": 2}
+        with patch.object(self.api, "make_get_request", return_value=response) as mock_get:
+            org_meta = self.api.get_org_meta()
+            self.assertEqual(self.api.get_org_meta(), org_meta)
+        mock_get.assert_called_once()
+
+        other_api = DatafoldAPI(api_key="an_api_key", host="https://datafold.example.com")
+        with patch.object(other_api, "make_get_request") as mock_get:
+            self.assertEqual(other_api.get_org_meta(), org_meta)
+        mock_get.assert_not_called()
+
+        other_key_api = DatafoldAPI(api_key="another_api_key", host="https://datafold.example.com")
+        with patch.object(other_key_api, "make_get_request", return_value=response) as mock_get:
+            other_key_api.get_org_meta()
+        mock_get.assert_called_once()
+
+    def test_get_data_source_memoized(self):
+        response = Mock()
+        response.json.return_value = {"id": 1, "name": "ds", "type": "snowflake"}
+        with patch.object(self.api, "make_get_request", return_value=response) as mock_get:
+            self.assertEqual(self.api.get_data_source(1).type, "snowflake")
+            self.assertEqual(self.api.get_data_source(1).type, "snowflake")
+        mock_get.assert_called_once_with(url="api/v1/data_sources/1")
+
+    def test_save_meta_cache_replaces_the_file(self):
+        _save_meta_cache({"a": 1})
+        _save_meta_cache({"b": 2})
+
+        self.assertEqual(_load_meta_cache(), {"b": 2})
+        # the temporary file is renamed over the cache, nothing is left behind
+        self.assertEqual(os.listdir(os.path.dirname(self.cache_file)), ["meta.json"])
@@ -1,4 +1,5 @@
 import os
+import threading
 
 from pathlib import Path
 from data_diff.cloud.datafold_api import TCloudApiDataSource
@@ -20,13 +21,16 @@ from .test_cli import run_datadiff_cli
 
 from data_diff.dbt import (
     _get_diff_vars,
+    _initialize_api,
     dbt_diff,
     _local_diff,
     _cloud_diff,
+    _run_diffs,
     DbtParser,
     TDiffVars,
     DatafoldAPI,
 )
+from data_diff.utils import run_as_daemon
 from data_diff.dbt_parser import (
     RUN_RESULTS_PATH,
     PROJECT_FILE,
@@ -101,6 +105,43 @@ class TestDbtParser(unittest.TestCase):
             _ = DbtParser.get_models(mock_self, selection)
         mock_self.get_dbt_selection_models.assert_not_called()
 
+    def test_get_pk_from_model_cached(self):
+        mock_self = Mock()
+        mock_self._pk_cache = {}
+        mock_self._find_pk_from_model.return_value = ["id"]
+        node = Mock()
+
+        unique_columns = {}
+
+        self.assertEqual(DbtParser.get_pk_from_model(mock_self, node, unique_columns, "primary-key"), ["id"])
+        self.assertEqual(DbtParser.get_pk_from_model(mock_self, node, unique_columns, "primary-key"), ["id"])
+        mock_self._find_pk_from_model.assert_called_once_with(node, unique_columns, "primary-key")
+
+        # other unique columns can give other keys
+        other_unique_columns = {node.unique_id: {"other_id"}}
+        mock_self._find_pk_from_model.return_value = ["other_id"]
+        self.assertEqual(
+            DbtParser.get_pk_from_model(mock_self, node, other_unique_columns, "primary-key"), ["other_id"]
+        )
+        self.assertEqual(mock_self._find_pk_from_model.call_count, 2)
+
+    def test_get_datadiff_model_config_cached(self):
+        mock_self = Mock()
+        mock_self._model_config_cache = {}
+        mock_self._parse_datadiff_model_config.side_effect = lambda meta: DbtParser._parse_datadiff_model_config(
+            mock_self, meta
+        )
+        meta = {"datafold": {"datadiff": {"filter": "a > 1"}}}
+
+        config = DbtParser.get_datadiff_model_config(mock_self, meta)
+        self.assertIs(DbtParser.get_datadiff_model_config(mock_self, meta), config)
+        self.assertEqual(config.where_filter, "a > 1")
+        mock_self._parse_datadiff_model_config.assert_called_once_with(meta)
+
+        # an equal but distinct meta dict is parsed on its own
+        DbtParser.get_datadiff_model_config(mock_self, dict(meta))
+        self.assertEqual(mock_self._parse_datadiff_model_config.call_count, 2)
+
     def test_get_models_no_selection(self):
         mock_self = Mock()
         mock_self.project_dir = Path()
@@ -501,7 +542,13 @@ class TestDbtDiffer(unittest.TestCase):
         column_dictionary = {"col1": ("col1", "type"), "col2": ("col2", "type")}
         mock_table1.get_schema.return_value = column_dictionary
         mock_table2 = Mock()
-        mock_table2.get_schema.return_value = column_dictionary
+        table2_schema_threads = []
+
+        def get_table2_schema():
+            table2_schema_threads.append(threading.current_thread())
+            return column_dictionary
+
+        mock_table2.get_schema.side_effect = get_table2_schema
         mock_diff = MagicMock()
         mock_diff_tables.return_value = mock_diff
         mock_diff.__iter__.return_value = [1, 2, 3]
@@ -524,8 +571,8 @@ class TestDbtDiffer(unittest.TestCase):
             _local_diff(diff_vars)
 
         mock_diff_tables.assert_called_once_with(
-            mock_table1,
-            mock_table2,
+            mock_table1.with_raw_schema.return_value,
+            mock_table2.with_raw_schema.return_value,
             threaded=True,
             algorithm=Algorithm.JOINDIFF,
             extra_columns=ANY,
@@ -534,9 +581,14 @@ class TestDbtDiffer(unittest.TestCase):
         )
         self.assertEqual(len(mock_diff_tables.call_args[1]["extra_columns"]), 2)
         self.assertEqual(mock_connect.call_count, 2)
+        mock_table1.with_raw_schema.assert_called_once_with(column_dictionary)
+        mock_table2.with_raw_schema.assert_called_once_with(column_dictionary)
         mock_connect.assert_any_call(connection, ".".join(dev_qualified_list), tuple(expected_primary_keys), threads)
         mock_connect.assert_any_call(connection, ".".join(prod_qualified_list), tuple(expected_primary_keys), threads)
         mock_diff.get_stats_string.assert_called_once()
+        # prod's schema is fetched on a daemon thread, which doesn't hold up the process from exiting
+        self.assertEqual(len(table2_schema_threads), 1)
+        self.assertTrue(table2_schema_threads[0].daemon)
 
     @patch("data_diff.dbt.diff_tables")
     def test_local_diff_types_differ(self, mock_diff_tables):
@@ -569,8 +621,8 @@ class TestDbtDiffer(unittest.TestCase):
             _local_diff(diff_vars)
 
         mock_diff_tables.assert_called_once_with(
-            mock_table1,
-            mock_table2,
+            mock_table1.with_raw_schema.return_value,
+            mock_table2.with_raw_schema.return_value,
             threaded=True,
             algorithm=Algorithm.JOINDIFF,
             extra_columns=ANY,
@@ -611,8 +663,8 @@ class TestDbtDiffer(unittest.TestCase):
             _local_diff(diff_vars)
 
         mock_diff_tables.assert_called_once_with(
-            mock_table1,
-            mock_table2,
+            mock_table1.with_raw_schema.return_value,
+            mock_table2.with_raw_schema.return_value,
             threaded=True,
             algorithm=Algorithm.JOINDIFF,
             extra_columns=ANY,
@@ -625,6 +677,62 @@ class TestDbtDiffer(unittest.TestCase):
         mock_connect.assert_any_call(connection, ".".join(prod_qualified_list), tuple(expected_primary_keys), None)
         mock_diff.get_stats_string.assert_not_called()
 
+    @patch("data_diff.dbt.diff_tables")
+    def test_local_diff_include_exclude_columns(self, mock_diff_tables):
+        column_dictionary = {
+            "key": ("key", "type"),
+            "col1": ("col1", "type"),
+            "col2": ("col2", "type"),
+            "col3": ("col3", "type"),
+        }
+        mock_table1 = Mock()
+        mock_table1.get_schema.return_value = column_dictionary
+        mock_table2 = Mock()
+        mock_table2.get_schema.return_value = column_dictionary
+        mock_diff = MagicMock()
+        mock_diff_tables.return_value = mock_diff
+        mock_diff.__iter__.return_value = []
+        diff_vars = TDiffVars(
+            dev_path=["dev_db", "dev_schema", "dev_table"],
+            prod_path=["prod_db", "prod_schema", "prod_table"],
+            primary_keys=["key"],
+            connection={},
+            threads=None,
+            where_filter=None,
+            include_columns=["COL1", "col2"],
+            exclude_columns=["Col2"],
+        )
+        with patch("data_diff.dbt.connect_to_table", side_effect=[mock_table1, mock_table2]):
+            _local_diff(diff_vars)
+
+        self.assertEqual(mock_diff_tables.call_args[1]["extra_columns"], ("col1",))
+
+    @patch("data_diff.dbt.rich.print")
+    @patch("data_diff.dbt.diff_tables")
+    def test_local_diff_no_prod_table(self, mock_diff_tables, mock_print):
+        mock_table1 = Mock()
+        mock_table1.get_schema.return_value = {"col1": ("col1", "type")}
+        mock_table2 = Mock()
+        mock_table2.get_schema.side_effect = Exception("table not found")
+        diff_vars = TDiffVars(
+            dev_path=["dev_db", "dev_schema", "dev_table"],
+            prod_path=["prod_db", "prod_schema", "prod_table"],
+            primary_keys=["key"],
+            connection={},
+            threads=None,
+            where_filter=None,
+            include_columns=[],
+            exclude_columns=[],
+        )
+        with patch("data_diff.dbt.connect_to_table", side_effect=[mock_table1, mock_table2]):
+            _local_diff(diff_vars)
+
+        mock_table1.get_schema.assert_called_once()
+        mock_table2.get_schema.assert_called_once()
+        mock_diff_tables.assert_not_called()
+        mock_print.assert_called_once()
+        self.assertIn("New model or no access to prod table.", mock_print.call_args[0][0])
+
     @patch("data_diff.dbt.rich.print")
     @patch("data_diff.dbt.os.environ")
     @patch("data_diff.dbt.DatafoldAPI")
@@ -666,6 +774,93 @@ class TestDbtDiffer(unittest.TestCase):
         self.assertEqual(payload.filter1, where)
         self.assertEqual(payload.filter2, where)
 
+    @patch("data_diff.dbt.logger")
+    @patch("data_diff.dbt.queue_event_json")
+    @patch("data_diff.dbt.is_tracking_enabled", return_value=True)
+    @patch("data_diff.dbt.rich.print")
+    def test_cloud_diff_failure_queues_end_event(self, mock_print, _, mock_queue_event_json, mock_logger):
+        org_meta = TCloudApiOrgMeta(org_id=1, org_name="", user_id=1)
+        mock_api = Mock()
+        mock_api.create_data_diff.side_effect = ValueError("failed")
+        diff_vars = TDiffVars(
+            dev_path=["dev_db", "dev_schema", "dev_table"],
+            prod_path=["prod_db", "prod_schema", "prod_table"],
+            primary_keys=["primary_key_column"],
+            connection={},
+            include_columns=[],
+            exclude_columns=[],
+        )
+
+        _cloud_diff(diff_vars, 1, org_meta=org_meta, api=mock_api)
+
+        # start and end events both go through the background queue
+        self.assertEqual(mock_queue_event_json.call_count, 2)
+        end_event = mock_queue_event_json.call_args[0][0]
+        self.assertFalse(end_event["properties"]["is_success"])
+        mock_print.assert_called_once()
+        mock_logger.error.assert_called_once()
+
+    @patch("data_diff.dbt.logger")
+    @patch("data_diff.dbt.is_tracking_enabled", return_value=False)
+    @patch("data_diff.dbt.rich.print")
+    def test_cloud_diff_failure_prints_link_with_output(self, mock_print, _, mock_logger):
+        org_meta = TCloudApiOrgMeta(org_id=1, org_name="", user_id=1)
+        mock_api = Mock()
+        mock_api.host = "https://app.datafold.com"
+        mock_api.create_data_diff.return_value = 123
+        mock_api.poll_data_diff_results.side_effect = ValueError("failed")
+        diff_vars = TDiffVars(
+            dev_path=["dev_db", "dev_schema", "dev_table"],
+            prod_path=["prod_db", "prod_schema", "prod_table"],
+            primary_keys=["primary_key_column"],
+            connection={},
+            include_columns=[],
+            exclude_columns=[],
+        )
+
+        _cloud_diff(diff_vars, 1, org_meta=org_meta, api=mock_api)
+
+        # the diff link, then the model's output together with the link in a single print
+        self.assertEqual(mock_print.call_count, 2)
+        output = mock_print.call_args[0][0]
+        self.assertIn("prod_db.prod_schema.prod_table <> dev_db.dev_schema.dev_table", output)
+        self.assertIn("https://app.datafold.com/datadiffs/123/overview", output)
+        mock_logger.error.assert_called_once()
+
+    @patch("data_diff.dbt.rich.print")
+    @patch("data_diff.dbt.keyring")
+    @patch("data_diff.dbt.os.environ", {"DATAFOLD_API_KEY": "an_api_key"})
+    def test_initialize_api_saves_new_env_key(self, mock_keyring, _):
+        mock_keyring.get_password.return_value = "an_old_api_key"
+
+        api = _initialize_api()
+
+        self.assertEqual(api.api_key, "an_api_key")
+        mock_keyring.set_password.assert_called_once_with("data-diff", "DATAFOLD_API_KEY", "an_api_key")
+
+    @patch("data_diff.dbt.rich.print")
+    @patch("data_diff.dbt.keyring")
+    @patch("data_diff.dbt.os.environ", {"DATAFOLD_API_KEY": "an_api_key"})
+    def test_initialize_api_skips_saving_known_env_key(self, mock_keyring, _):
+        mock_keyring.get_password.return_value = "an_api_key"
+
+        api = _initialize_api()
+
+        self.assertEqual(api.api_key, "an_api_key")
+        mock_keyring.set_password.assert_not_called()
+
+    @patch("data_diff.dbt.rich.print")
+    @patch("data_diff.dbt.keyring")
+    @patch("data_diff.dbt.os.environ", {})
+    def test_initialize_api_key_from_keyring(self, mock_keyring, _):
+        mock_keyring.get_password.return_value = "an_api_key"
+
+        api = _initialize_api()
+
+        self.assertEqual(api.api_key, "an_api_key")
+        mock_keyring.get_password.assert_called_once_with("data-diff", "DATAFOLD_API_KEY")
+        mock_keyring.set_password.assert_not_called()
+
     @patch("data_diff.dbt._initialize_api")
     @patch("data_diff.dbt._get_diff_vars")
     @patch("data_diff.dbt._local_diff")
@@ -713,7 +908,11 @@ class TestDbtDiffer(unittest.TestCase):
             exclude_columns=[],
         )
         mock_get_diff_vars.return_value = diff_vars
-        dbt_diff(is_cloud=True)
+        with patch("data_diff.dbt.flush_event_queue") as mock_flush_event_queue:
+            mock_flush_event_queue.side_effect = lambda: self.assertEqual(mock_cloud_diff.call_count, 1)
+            dbt_diff(is_cloud=True)
+        # the end events queued by the cloud diffs are flushed once they are done
+        mock_flush_event_queue.assert_called_once_with()
         mock_dbt_parser_inst.get_models.assert_called_once()
         mock_dbt_parser_inst.set_connection.assert_not_called()
         mock_dbt_parser_inst.set_casing_policy_for.assert_called_once()
@@ -774,12 +973,15 @@ class TestDbtDiffer(unittest.TestCase):
         mock_local_diff.assert_not_called()
         mock_print.assert_called_once()
 
+    @patch("data_diff.dbt.connect")
     @patch("data_diff.dbt._get_diff_vars")
     @patch("data_diff.dbt._local_diff")
     @patch("data_diff.dbt._cloud_diff")
     @patch("data_diff.dbt_parser.DbtParser.__new__")
     @patch("data_diff.dbt.rich.print")
-    def test_diff_is_not_cloud(self, mock_print, mock_dbt_parser, mock_cloud_diff, mock_local_diff, mock_get_diff_vars):
+    def test_diff_is_not_cloud(
+        self, mock_print, mock_dbt_parser, mock_cloud_diff, mock_local_diff, mock_get_diff_vars, mock_connect
+    ):
         expected_dbt_vars_dict = {
             "prod_database": "prod_db",
             "prod_schema": "prod_schema",
@@ -789,6 +991,7 @@ class TestDbtDiffer(unittest.TestCase):
         where = "a_string"
         mock_dbt_parser_inst = Mock()
         mock_dbt_parser.return_value = mock_dbt_parser_inst
+        mock_dbt_parser_inst.threads = threads
         mock_model = Mock()
         mock_dbt_parser_inst.get_models.return_value = [mock_model]
         mock_dbt_parser_inst.get_datadiff_variables.return_value = expected_dbt_vars_dict
@@ -811,13 +1014,142 @@ class TestDbtDiffer(unittest.TestCase):
         mock_cloud_diff.assert_not_called()
         mock_local_diff.assert_called_once_with(diff_vars)
         mock_print.assert_not_called()
+        mock_connect.assert_called_once_with(mock_dbt_parser_inst.connection, mock_dbt_parser_inst.threads)
+        mock_connect.return_value.close.assert_called_once()
+
+    def test_run_diffs_reuses_workers(self):
+        diffed = []
+        with patch("data_diff.dbt.run_as_daemon", wraps=run_as_daemon) as mock_run_as_daemon:
+            _run_diffs(lambda name, n: diffed.append((name, n)), [("model", n) for n in range(5)], max_workers=2)
 
+        # a fixed set of workers goes through every diff
+        self.assertEqual(mock_run_as_daemon.call_count, 2)
+        self.assertCountEqual(diffed, [("model", n) for n in range(5)])
+
+    @patch("data_diff.dbt.flush_event_queue")
+    @patch("data_diff.dbt._run_diffs", side_effect=KeyboardInterrupt)
+    @patch("data_diff.dbt.connect")
+    @patch("data_diff.dbt._get_diff_vars")
+    @patch("data_diff.dbt_parser.DbtParser.__new__")
+    @patch("data_diff.dbt.rich.print")
+    def test_diff_interrupted_skips_flush(
+        self, mock_print, mock_dbt_parser, mock_get_diff_vars, mock_connect, mock_run_diffs, mock_flush_event_queue
+    ):
+        mock_dbt_parser_inst = Mock()
+        mock_dbt_parser.return_value = mock_dbt_parser_inst
+        mock_dbt_parser_inst.threads = 1
+        mock_dbt_parser_inst.get_models.return_value = [Mock()]
+        mock_dbt_parser_inst.get_datadiff_variables.return_value = {}
+        mock_get_diff_vars.return_value = TDiffVars(
+            dev_path=["dev"],
+            prod_path=["prod"],
+            primary_keys=["pks"],
+            connection={},
+            include_columns=[],
+            exclude_columns=[],
+        )
+
+        with self.assertRaises(KeyboardInterrupt):
+            dbt_diff(is_cloud=False)
+
+        # exits right away, without waiting on the tracking events
+        mock_flush_event_queue.assert_not_called()
+        mock_connect.return_value.close.assert_called_once()
+
+    def test_run_diffs_raises_first_failure(self):
+        def diff(n):
+            if n in (1, 3):
+                raise ValueError(n)
+
+        with self.assertRaises(ValueError) as cm:
+            _run_diffs(diff, [(n,) for n in range(5)], max_workers=3)
+        self.assertEqual(cm.exception.args, (1,))
+
+    @patch("data_diff.dbt.connect")
+    @patch("data_diff.dbt._get_diff_vars")
+    @patch("data_diff.dbt._local_diff")
+    @patch("data_diff.dbt_parser.DbtParser.__new__")
+    @patch("data_diff.dbt.rich.print")
+    def test_diff_is_not_cloud_many_models(
+        self, mock_print, mock_dbt_parser, mock_local_diff, mock_get_diff_vars, mock_connect
+    ):
+        mock_dbt_parser_inst = Mock()
+        mock_dbt_parser.return_value = mock_dbt_parser_inst
+        mock_dbt_parser_inst.threads = 2
+        mock_dbt_parser_inst.get_models.return_value = [Mock(), Mock(), Mock()]
+        mock_dbt_parser_inst.get_datadiff_variables.return_value = {}
+
+        diff_vars = [
+            TDiffVars(
+                dev_path=["dev", name],
+                prod_path=["prod", name],
+                primary_keys=["pks"],
+                connection={},
+                include_columns=[],
+                exclude_columns=[],
+            )
+            for name in ("a", "b", "c")
+        ]
+        mock_get_diff_vars.side_effect = diff_vars
+        mock_local_diff.side_effect = [None, ValueError("failed"), None]
+
+        with patch("data_diff.dbt.flush_event_queue") as mock_flush_event_queue:
+            with self.assertRaises(ValueError):
+                dbt_diff(is_cloud=False)
+
+        # the queued tracking events still get flushed
+        mock_flush_event_queue.assert_called_once()
+        # every model is still diffed when another one fails
+        self.assertEqual(mock_local_diff.call_count, 3)
+        for vars_ in diff_vars:
+            mock_local_diff.assert_any_call(vars_)
+        # the shared connection is closed even though a diff failed
+        mock_connect.return_value.close.assert_called_once()
+
+    def test_run_diffs_interrupted(self):
+        started, release = threading.Event(), threading.Event()
+        self.addCleanup(release.set)
+        diffed = []
+
+        def diff(n):
+            diffed.append(n)
+            started.set()
+            release.wait(5)
+
+        workers = []
+
+        def interrupt():
+            started.wait(5)
+            raise KeyboardInterrupt
+
+        def start_worker(worker):
+            workers.append(run_as_daemon(worker))
+            # the interrupt arrives while the main thread waits on the running diff
+            return Mock(join=Mock(side_effect=interrupt))
+
+        with patch("data_diff.dbt.run_as_daemon", side_effect=start_worker):
+            with self.assertRaises(KeyboardInterrupt):
+                _run_diffs(diff, [(n,) for n in range(3)], max_workers=1)
+
+        # the worker is a daemon, so it doesn't hold up the exit
+        self.assertTrue(workers[0].daemon)
+        self.assertTrue(workers[0].is_alive())
+
+        # once the running diff is done, the pending ones are dropped
+        release.set()
+        workers[0].join(5)
+        self.assertFalse(workers[0].is_alive())
+        self.assertEqual(diffed, [0])
+
+    @patch("data_diff.dbt.connect")
     @patch("data_diff.dbt._get_diff_vars")
     @patch("data_diff.dbt._local_diff")
     @patch("data_diff.dbt._cloud_diff")
     @patch("data_diff.dbt_parser.DbtParser.__new__")
     @patch("data_diff.dbt.rich.print")
-    def test_diff_only_prod_db(self, mock_print, mock_dbt_parser, mock_cloud_diff, mock_local_diff, mock_get_diff_vars):
+    def test_diff_only_prod_db(
+        self, mock_print, mock_dbt_parser, mock_cloud_diff, mock_local_diff, mock_get_diff_vars, mock_connect
+    ):
         connection = {}
         threads = None
         where = "a_string"
@@ -827,6 +1159,7 @@ class TestDbtDiffer(unittest.TestCase):
         }
         mock_dbt_parser_inst = Mock()
         mock_dbt_parser.return_value = mock_dbt_parser_inst
+        mock_dbt_parser_inst.threads = threads
         mock_model = Mock()
         mock_dbt_parser_inst.get_models.return_value = [mock_model]
         mock_dbt_parser_inst.get_datadiff_variables.return_value = expected_dbt_vars_dict
@@ -850,13 +1183,14 @@ class TestDbtDiffer(unittest.TestCase):
         mock_local_diff.assert_called_once_with(diff_vars)
         mock_print.assert_not_called()
 
+    @patch("data_diff.dbt.connect")
     @patch("data_diff.dbt._get_diff_vars")
     @patch("data_diff.dbt._local_diff")
     @patch("data_diff.dbt._cloud_diff")
     @patch("data_diff.dbt_parser.DbtParser.__new__")
     @patch("data_diff.dbt.rich.print")
     def test_diff_only_prod_schema(
-        self, mock_print, mock_dbt_parser, mock_cloud_diff, mock_local_diff, mock_get_diff_vars
+        self, mock_print, mock_dbt_parser, mock_cloud_diff, mock_local_diff, mock_get_diff_vars, mock_connect
     ):
         connection = {}
         threads = None
@@ -867,6 +1201,7 @@ class TestDbtDiffer(unittest.TestCase):
         }
         mock_dbt_parser_inst = Mock()
         mock_dbt_parser.return_value = mock_dbt_parser_inst
+        mock_dbt_parser_inst.threads = threads
         mock_model = Mock()
         mock_dbt_parser_inst.get_models.return_value = [mock_model]
         mock_dbt_parser_inst.get_datadiff_variables.return_value = expected_dbt_vars_dict
@@ -944,13 +1279,14 @@ class TestDbtDiffer(unittest.TestCase):
         mock_local_diff.assert_not_called()
         self.assertEqual(mock_print.call_count, 2)
 
+    @patch("data_diff.dbt.connect")
     @patch("data_diff.dbt._get_diff_vars")
     @patch("data_diff.dbt._local_diff")
     @patch("data_diff.dbt._cloud_diff")
     @patch("data_diff.dbt_parser.DbtParser.__new__")
     @patch("data_diff.dbt.rich.print")
     def test_diff_not_is_cloud_no_pks(
-        self, mock_print, mock_dbt_parser, mock_cloud_diff, mock_local_diff, mock_get_diff_vars
+        self, mock_print, mock_dbt_parser, mock_cloud_diff, mock_local_diff, mock_get_diff_vars, mock_connect
     ):
         connection = {}
         threads = None
@@ -983,6 +1319,8 @@ class TestDbtDiffer(unittest.TestCase):
         mock_cloud_diff.assert_not_called()
         mock_local_diff.assert_not_called()
         self.assertEqual(mock_print.call_count, 1)
+        # nothing to diff, so no connection is opened
+        mock_connect.assert_not_called()
 
     def test_get_diff_vars_replace_custom_schema(self):
         prod_database = "a_prod_db"
@@ -1015,6 +1353,8 @@ class TestDbtDiffer(unittest.TestCase):
         self.assertEqual(diff_vars.threads, mock_dbt_parser.threads)
         self.assertEqual(diff_vars.threads, mock_dbt_parser.threads)
         self.assertNotIn(prod_schema, diff_vars.prod_path)
+        self.assertEqual(diff_vars.dev_qualified_str, "a_dev_db.a_custom_schema.a_model_name")
+        self.assertEqual(diff_vars.prod_qualified_str, "a_prod_db.prod_a_custom_schema.a_model_name")
 
         mock_dbt_parser.get_pk_from_model.assert_called_once()
 
@@ -1081,6 +1421,33 @@ class TestDbtDiffer(unittest.TestCase):
         self.assertEqual(diff_vars.threads, mock_dbt_parser.threads)
         mock_dbt_parser.get_pk_from_model.assert_called_once()
 
+    def test_get_diff_vars_cloud_only(self):
+        mock_model = Mock()
+        mock_model.database = "a_dev_db"
+        mock_model.schema_ = "a_schema"
+        mock_model.config.schema_ = None
+        mock_model.config.database = None
+        mock_model.alias = "a_model_name"
+        mock_tdatadiffmodelconfig = Mock()
+        mock_tdatadiffmodelconfig.where_filter = "where"
+        mock_tdatadiffmodelconfig.include_columns = ["include"]
+        mock_tdatadiffmodelconfig.exclude_columns = ["exclude"]
+        mock_dbt_parser = Mock()
+        mock_dbt_parser.get_pk_from_model.return_value = ["a_primary_key"]
+        mock_dbt_parser.get_datadiff_model_config.return_value = mock_tdatadiffmodelconfig
+        mock_dbt_parser.connection = {"driver": "snowflake"}
+        mock_dbt_parser.threads = 4
+        mock_dbt_parser.requires_upper = False
+        mock_model.meta = None
+
+        diff_vars = _get_diff_vars(mock_dbt_parser, "a_prod_db", None, None, mock_model, cloud_only=True)
+
+        self.assertEqual(diff_vars.prod_path, ["a_prod_db", mock_model.schema_, mock_model.alias])
+        self.assertEqual(diff_vars.primary_keys, ["a_primary_key"])
+        self.assertEqual(diff_vars.where_filter, "where")
+        self.assertEqual(diff_vars.connection, {})
+        self.assertIsNone(diff_vars.threads)
+
     def test_get_diff_vars_match_dev_schema(self):
         mock_model = Mock()
         prod_database = "a_prod_db"
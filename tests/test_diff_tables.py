@@ -2,6 +2,7 @@ from datetime import datetime, timedelta
 from typing import Callable
 import uuid
 import unittest
+from unittest.mock import patch
 
 from data_diff.sqeleton.queries import table, this, commit, code
 from data_diff.sqeleton.utils import ArithAlphanumeric, numberToAlphanum
@@ -143,6 +144,15 @@ class TestDiffTables(DiffTestCase):
         self.assertEqual(0, table.count())
         self.assertEqual(None, table.count_and_checksum()[1])
 
+    def test_with_raw_schema(self):
+        raw_schema = self.table.get_schema()
+        table = self.table.with_raw_schema(raw_schema)
+
+        with patch.object(self.connection, "query_table_schema") as mock_query_table_schema:
+            table = table.with_schema()
+        mock_query_table_schema.assert_not_called()
+        self.assertEqual(table._schema, self.table.with_schema()._schema)
+
     def test_get_values(self):
         time = "2022-01-01 00:00:00.000000"
         time_obj = datetime.fromisoformat(time)
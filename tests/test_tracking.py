@@ -0,0 +1,84 @@
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from data_diff import tracking
+
+
+class TestEventQueue(unittest.TestCase):
+    def setUp(self) -> None:
+        # every test gets its own queue and senders
+        for name, value in (("_event_queue", None), ("_event_senders", 0)):
+            global_patch = patch.object(tracking, name, value)
+            global_patch.start()
+            self.addCleanup(global_patch.stop)
+
+        self.sent = []
+        self.release = threading.Event()
+        self.release.set()
+        self.addCleanup(self.release.set)
+
+        def send_event_json(event_json):
+            self.release.wait(5)
+            self.sent.append(event_json)
+
+        send_patch = patch.object(tracking, "send_event_json", side_effect=send_event_json)
+        send_patch.start()
+        self.addCleanup(send_patch.stop)
+
+    def test_queued_events_are_sent(self):
+        events = [{"event": i} for i in range(3)]
+        for event_json in events:
+            tracking.queue_event_json(event_json)
+
+        tracking.flush_event_queue()
+
+        self.assertCountEqual(self.sent, events)
+
+    def test_one_sender_while_it_keeps_up(self):
+        with patch.object(tracking, "run_as_daemon", wraps=tracking.run_as_daemon) as mock_run_as_daemon:
+            for i in range(3):
+                tracking.queue_event_json({"event": i})
+                tracking.flush_event_queue()
+
+        mock_run_as_daemon.assert_called_once()
+        self.assertEqual(len(self.sent), 3)
+
+    def test_senders_are_bounded(self):
+        self.release.clear()
+        with patch.object(tracking, "run_as_daemon", wraps=tracking.run_as_daemon) as mock_run_as_daemon:
+            for i in range(tracking.MAX_EVENT_SENDERS * 2):
+                tracking.queue_event_json({"event": i})
+
+        self.assertEqual(mock_run_as_daemon.call_count, tracking.MAX_EVENT_SENDERS)
+
+        self.release.set()
+        tracking.flush_event_queue()
+        self.assertEqual(len(self.sent), tracking.MAX_EVENT_SENDERS * 2)
+
+    def test_flush_gives_up_at_the_deadline(self):
+        self.release.clear()
+        tracking.queue_event_json({"event": 0})
+
+        start = time.monotonic()
+        tracking.flush_event_queue(timeout=0.2)
+        elapsed = time.monotonic() - start
+
+        self.assertGreaterEqual(elapsed, 0.2)
+        self.assertLess(elapsed, 2)
+        self.assertEqual(self.sent, [])
+
+    @patch("data_diff.tracking.TIMEOUT", 0.2)
+    def test_flush_deadline_does_not_grow_with_queued_events(self):
+        self.release.clear()
+        for i in range(tracking.MAX_EVENT_SENDERS * 4):
+            tracking.queue_event_json({"event": i})
+
+        start = time.monotonic()
+        tracking.flush_event_queue()
+        elapsed = time.monotonic() - start
+
+        # a slow endpoint holds up the exit by at most TIMEOUT, however many events are queued
+        self.assertGreaterEqual(elapsed, 0.2)
+        self.assertLess(elapsed, 1)